@@ -6,10 +6,25 @@ A conversational AI interface using transformer models
 
 import streamlit as st
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import (
+    AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer, pipeline
+)
+from transformers.pytorch_utils import Conv1D
+from concurrent.futures import Future
+from threading import Event, Thread
+import os
+import queue
+import shutil
 import time
 import random
 
+# ONNX Runtime serving is optional; fall back to PyTorch when it isn't installed
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForCausalLM
+except ImportError:
+    ORTModelForCausalLM = None
+
 # Configure page
 st.set_page_config(
     page_title="AI Chatbot",
@@ -25,52 +40,489 @@ Powered by state-of-the-art transformer models for natural conversation.
 Chat with our AI assistant about anything you'd like to know!
 """)
 
+# Conversational model used by the app (override with CHATBOT_MODEL)
+MODEL_NAME = os.environ.get("CHATBOT_MODEL", "microsoft/DialoGPT-small")
+
+# Smaller model that drafts tokens for assisted (speculative) generation
+# when a larger DialoGPT is used as the main model
+DRAFT_MODEL_NAME = "microsoft/DialoGPT-small"
+
+# Where the exported ONNX model is saved so later runs skip the export
+# (override with CHATBOT_ONNX_DIR; defaults to the writable Hugging Face cache,
+# since the app directory may be read-only on hosted deployments)
+ONNX_MODEL_DIR = os.environ.get("CHATBOT_ONNX_DIR") or os.path.join(
+    os.environ.get("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface")),
+    "onnx",
+    MODEL_NAME.replace("/", "--")
+)
+
+# Run on the GPU when one is present
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def default_num_threads():
+    """Intra-op thread count from OMP_NUM_THREADS, else every available core"""
+    try:
+        return max(int(os.environ["OMP_NUM_THREADS"]), 1)
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+@st.cache_resource(show_spinner=False)
+def configure_torch():
+    """Apply process-wide inference settings once rather than on every rerun"""
+    # Use every available core for intra-op work and allow reduced-precision
+    # float32 matmuls. Gradients are skipped per call with torch.inference_mode(),
+    # since grad mode is thread-local and generation runs on a background thread.
+    torch.set_num_threads(default_num_threads())
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Fails once inter-op work has already started in this process
+        pass
+    torch.set_float32_matmul_precision("high")
+
+def cpu_supports_bf16():
+    """Check whether the CPU has native BF16 instructions (AVX512-BF16 / AMX)"""
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            flags = cpuinfo.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+# Use BF16 autocast during generation on CPUs that support it natively. These
+# CPUs skip int8 quantization: quantized Linear layers only accept float32 input.
+USE_CPU_BF16 = DEVICE == "cpu" and cpu_supports_bf16()
+
+# Most conversation tokens fed back to the model each turn. Once exceeded, the
+# history is cut back to half of it so the rebuilt KV cache can be reused again.
+HISTORY_WINDOW = 512
+
+# Upper bound on tokens generated per reply; together with the window this
+# stays within GPT-2's 1024 positions
+MAX_RESPONSE_TOKENS = 512
+
+# Concurrent requests arriving within this window are generated as one batch
+BATCH_WAIT_SECONDS = 0.01
+MAX_BATCH_SIZE = 8
+
+# Sampling settings shared by every generate() call
+SAMPLING_KWARGS = {
+    "no_repeat_ngram_size": 2,
+    "temperature": 0.7,
+    "do_sample": True,
+    "top_p": 0.92,
+    "top_k": 50,
+    "repetition_penalty": 1.2
+}
+
+def conv1d_to_linear(module):
+    """Replace GPT-2's transformers Conv1D layers with equivalent nn.Linear layers"""
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            # Conv1D stores its weight as (in_features, out_features)
+            linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+
+def quantize_model(model):
+    """Dynamically quantize the transformer blocks to int8 for CPU inference"""
+    # GPT-2 projections are Conv1D, and the only nn.Linear (lm_head) is tied to
+    # the token embedding, so quantize the converted blocks and leave lm_head alone
+    if not hasattr(model, "transformer"):
+        return model
+    
+    engines = torch.backends.quantized.supported_engines
+    
+    # Prefer oneDNN (VNNI) kernels and skip quantization on CPUs without a fast int8 engine
+    if "onednn" in engines:
+        torch.backends.quantized.engine = "onednn"
+    elif "x86" in engines:
+        torch.backends.quantized.engine = "x86"
+    elif "fbgemm" in engines:
+        torch.backends.quantized.engine = "fbgemm"
+    else:
+        return model
+    
+    try:
+        conv1d_to_linear(model.transformer)
+        torch.ao.quantization.quantize_dynamic(model.transformer, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    except Exception:
+        pass
+    
+    return model
+
+def compile_model(tokenizer, model):
+    """Compile the model forward pass with torch.compile and warm it up"""
+    eager_forward = model.forward
+    try:
+        major, minor = (int(part) for part in torch.__version__.split(".")[:2])
+        if (major, minor) < (2, 1):
+            return model
+        
+        # Compile forward rather than wrapping the module so that
+        # model.generate() (which calls self.forward) uses the compiled graph.
+        # The default mode is used: "reduce-overhead" only helps on CUDA and its
+        # CUDA graphs keep thread-local state.
+        model.forward = torch.compile(model.forward, fullgraph=False)
+        
+        # Warm up with two prompt lengths and a few cached decode steps, so both
+        # prefill and decode are compiled with dynamic shapes before the first
+        # user request instead of being recompiled for its sizes
+        for warmup_text in ("Hello", "Hello! How are you doing today? Tell me something interesting."):
+            warmup_ids = tokenizer.encode(warmup_text + tokenizer.eos_token, return_tensors='pt').to(model.device)
+            with torch.inference_mode():
+                model.generate(
+                    warmup_ids,
+                    attention_mask=torch.ones_like(warmup_ids),
+                    max_new_tokens=8,
+                    use_cache=True,
+                    pad_token_id=tokenizer.pad_token_id,
+                    eos_token_id=tokenizer.eos_token_id
+                )
+    except Exception:
+        # Fall back to eager mode if compilation is unsupported on this host
+        model.forward = eager_forward
+    
+    return model
+
+def load_onnx_model():
+    """Load the model with ONNX Runtime for CPU serving, exporting it on first use"""
+    # Fuse LayerNorm/GELU/attention into single kernels
+    session_options = ort.SessionOptions()
+    session_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    
+    # Only reuse a finished export; a crash mid-save must not leave a "valid" directory
+    export = not os.path.isfile(os.path.join(ONNX_MODEL_DIR, "model.onnx"))
+    model = ORTModelForCausalLM.from_pretrained(
+        MODEL_NAME if export else ONNX_MODEL_DIR,
+        export=export,
+        use_io_binding=True,
+        provider="CPUExecutionProvider",
+        session_options=session_options
+    )
+    
+    if export:
+        # Save next to the final location, then move it into place in one step.
+        # A read-only or full disk only costs the re-export on the next start.
+        staging_dir = ONNX_MODEL_DIR + ".partial"
+        try:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            model.save_pretrained(staging_dir)
+            shutil.rmtree(ONNX_MODEL_DIR, ignore_errors=True)
+            os.replace(staging_dir, ONNX_MODEL_DIR)
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    return model
+
+def load_draft_model(model):
+    """Load the draft model for speculative decoding, if it is smaller than the main model"""
+    # Assisted generation needs a PyTorch target and a genuinely smaller draft
+    if MODEL_NAME == DRAFT_MODEL_NAME or not isinstance(model, torch.nn.Module):
+        return None
+    
+    try:
+        draft_model = AutoModelForCausalLM.from_pretrained(
+            DRAFT_MODEL_NAME,
+            torch_dtype=torch.float16 if DEVICE == "cuda" else torch.float32,
+            low_cpu_mem_usage=True
+        ).to(model.device)
+        
+        # Quantize like the target on CPU, otherwise the draft moves about as
+        # many weight bytes per token as the int8 target and can't pay off
+        if DEVICE == "cpu" and not USE_CPU_BF16:
+            draft_model = quantize_model(draft_model)
+        return draft_model.eval()
+    except Exception:
+        return None
+
 @st.cache_resource
 def load_chatbot():
     """Load the conversational model with caching"""
     try:
-        # Use DialoGPT model for conversation
-        tokenizer = AutoTokenizer.from_pretrained("microsoft/DialoGPT-medium")
-        model = AutoModelForCausalLM.from_pretrained("microsoft/DialoGPT-medium")
+        # Use the small DialoGPT model for conversation (117M vs 345M params
+        # for medium) - roughly 3x less weight traffic per decoded token on CPU
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+        if not tokenizer.is_fast:
+            raise RuntimeError("A fast (Rust) tokenizer is required")
+        model = None
+        
+        if DEVICE == "cuda":
+            # Load int8 weights on GPU (needs bitsandbytes + accelerate)
+            try:
+                model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_NAME,
+                    load_in_8bit=True,
+                    device_map="auto"
+                )
+            except Exception:
+                model = None
+        
+            if model is None:
+                # Fall back to FP16 weights on the GPU
+                model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_NAME,
+                    torch_dtype=torch.float16,
+                    low_cpu_mem_usage=True
+                ).to(DEVICE)
+        else:
+            # Serve from ONNX Runtime on CPU when available
+            if ORTModelForCausalLM is not None:
+                try:
+                    model = load_onnx_model()
+                except Exception:
+                    model = None
+            
+            if model is None:
+                model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_NAME,
+                    torch_dtype=torch.float32,
+                    low_cpu_mem_usage=True
+                )
+                if not USE_CPU_BF16:
+                    model = quantize_model(model)
         
         # Add padding token if it doesn't exist
         if tokenizer.pad_token is None:
             tokenizer.pad_token = tokenizer.eos_token
         
-        return tokenizer, model
+        # ONNX Runtime models are already graph-optimized
+        if isinstance(model, torch.nn.Module):
+            model.eval()
+            model = compile_model(tokenizer, model)
+        
+        draft_model = load_draft_model(model)
+        
+        return tokenizer, model, draft_model
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
-        return None, None
+        return None, None, None
+
+def encode_user_input(tokenizer, user_input):
+    """Encode a user message with the fast tokenizer and append the EOS token id"""
+    input_ids = tokenizer(user_input, return_tensors='pt', add_special_tokens=False).input_ids
+    eos_ids = torch.tensor([[tokenizer.eos_token_id]], dtype=input_ids.dtype)
+    return torch.cat([input_ids, eos_ids], dim=-1)
+
+def turn_boundary_start(history_ids, keep_tokens, eos_token_id):
+    """Index to keep history from: at most keep_tokens, starting at a turn (after an EOS)"""
+    start = history_ids.shape[-1] - keep_tokens
+    if start <= 0:
+        return 0
+    
+    # Move forward to the first turn boundary so the kept history doesn't start mid-utterance
+    eos_positions = (history_ids[0, start - 1:] == eos_token_id).nonzero()
+    if len(eos_positions) > 0:
+        return start + eos_positions[0].item()
+    return start
+
+def copy_cache(past_key_values):
+    """Wrap the cached tensors in a new Cache object so generate() can't extend the caller's one in place"""
+    if hasattr(past_key_values, "to_legacy_cache"):
+        return type(past_key_values).from_legacy_cache(past_key_values.to_legacy_cache())
+    return past_key_values
+
+class CancelledCriteria(StoppingCriteria):
+    """Stop generating once every request in the batch has been abandoned"""
+    
+    def __init__(self, cancel_events):
+        self.cancel_events = cancel_events
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        return all(event.is_set() for event in self.cancel_events)
 
-def generate_response(tokenizer, model, chat_history, user_input, max_length=1000):
-    """Generate chatbot response"""
+def generate_single(tokenizer, model, draft_model, request):
+    """Run one generation request with its KV cache, draft model and streamer"""
+    input_ids, past_key_values, max_new_tokens, streamer, future, cancelled = request
     try:
-        # Encode the conversation history
-        new_user_input_ids = tokenizer.encode(user_input + tokenizer.eos_token, return_tensors='pt')
-        
-        # Append the new user input tokens to the chat history
-        bot_input_ids = torch.cat([chat_history, new_user_input_ids], dim=-1) if chat_history is not None else new_user_input_ids
-        
-        # Generate response
-        with torch.no_grad():
-            chat_history_ids = model.generate(
-                bot_input_ids, 
-                max_length=max_length,
-                num_beams=3,
-                no_repeat_ngram_size=2,
-                temperature=0.7,
-                do_sample=True,
+        with torch.inference_mode(), torch.autocast(device_type="cpu", dtype=torch.bfloat16, enabled=USE_CPU_BF16):
+            output = model.generate(
+                input_ids, 
+                attention_mask=torch.ones_like(input_ids),
+                past_key_values=past_key_values,
+                use_cache=True,
+                return_dict_in_generate=True,
+                max_new_tokens=max_new_tokens,
+                pad_token_id=tokenizer.pad_token_id,
+                eos_token_id=tokenizer.eos_token_id,
+                assistant_model=draft_model,
+                streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([CancelledCriteria([cancelled])]),
+                **SAMPLING_KWARGS
+            )
+        future.set_result((output.sequences[:, input_ids.shape[-1]:], output.past_key_values))
+    except Exception as e:
+        streamer.end()
+        future.set_exception(e)
+
+def generate_batch(tokenizer, model, requests):
+    """Run several generation requests as one left-padded batch"""
+    try:
+        # Left-pad every conversation to the longest one
+        batch_length = max(input_ids.shape[-1] for input_ids, *_ in requests)
+        batch_ids = torch.full((len(requests), batch_length), tokenizer.pad_token_id, dtype=torch.long, device=model.device)
+        attention_mask = torch.zeros_like(batch_ids)
+        for row, (input_ids, *_) in enumerate(requests):
+            batch_ids[row, batch_length - input_ids.shape[-1]:] = input_ids[0]
+            attention_mask[row, batch_length - input_ids.shape[-1]:] = 1
+        
+        with torch.inference_mode(), torch.autocast(device_type="cpu", dtype=torch.bfloat16, enabled=USE_CPU_BF16):
+            sequences = model.generate(
+                batch_ids,
+                attention_mask=attention_mask,
+                max_new_tokens=max(max_new_tokens for _, _, max_new_tokens, *_ in requests),
                 pad_token_id=tokenizer.pad_token_id,
-                eos_token_id=tokenizer.eos_token_id
+                eos_token_id=tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([CancelledCriteria([request[-1] for request in requests])]),
+                **SAMPLING_KWARGS
+            )
+        
+        for row, (_, _, max_new_tokens, streamer, future, _) in enumerate(requests):
+            # The batch runs to the largest budget, so cut each reply to its own,
+            # then keep it up to and including its first EOS; the rest is padding
+            generated_ids = sequences[row:row + 1, batch_length:batch_length + max_new_tokens]
+            eos_positions = (generated_ids[0] == tokenizer.eos_token_id).nonzero()
+            if len(eos_positions) > 0:
+                generated_ids = generated_ids[:, :eos_positions[0].item() + 1]
+            
+            streamer.on_finalized_text(tokenizer.decode(generated_ids[0], skip_special_tokens=True), stream_end=True)
+            # The batch's padded KV cache can't be reused per conversation
+            future.set_result((generated_ids, None))
+    except Exception as e:
+        for *_, streamer, future, _ in requests:
+            if not future.done():
+                streamer.end()
+                future.set_exception(e)
+
+def generation_worker(tokenizer, model, draft_model, request_queue):
+    """Collect pending requests into batches and run them on the shared model"""
+    while True:
+        batch = [request_queue.get()]
+        deadline = time.monotonic() + BATCH_WAIT_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(request_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        
+        # Skip requests whose session moved on (e.g. a Streamlit rerun) while queued
+        batch = [request for request in batch if not request[-1].is_set()]
+        if not batch:
+            continue
+        
+        # A lone request keeps its KV cache, draft model and token streaming
+        if len(batch) == 1:
+            generate_single(tokenizer, model, draft_model, batch[0])
+        else:
+            generate_batch(tokenizer, model, batch)
+
+@st.cache_resource
+def get_generation_queue(_tokenizer, _model, _draft_model):
+    """Start the background generation worker shared by all sessions"""
+    request_queue = queue.Queue()
+    Thread(
+        target=generation_worker,
+        args=(_tokenizer, _model, _draft_model, request_queue),
+        daemon=True
+    ).start()
+    return request_queue
+
+def generate_response(tokenizer, model, chat_history, user_input, max_new_tokens=200, placeholder=None, input_ids=None,
+                      draft_model=None):
+    """Generate chatbot response
+    
+    chat_history is the (history_buffer, history_length, past_key_values,
+    staging_buffer) state returned by the previous turn, or None at the start
+    of a conversation.
+    When a Streamlit placeholder is given, tokens are rendered into it as they
+    are generated. Pass input_ids to reuse an already encoded user_input, and
+    draft_model to enable speculative decoding.
+    """
+    # Set when this call returns or is interrupted by a Streamlit rerun, so the
+    # worker stops generating a reply nobody will read
+    cancelled = Event()
+    try:
+        # Encode the conversation history
+        if input_ids is None:
+            input_ids = encode_user_input(tokenizer, user_input)
+        max_new_tokens = min(max_new_tokens, MAX_RESPONSE_TOKENS)
+        new_user_input_ids = input_ids[:, -HISTORY_WINDOW:]
+        new_length = new_user_input_ids.shape[-1]
+        
+        # Conversation tokens live in one preallocated buffer that is written
+        # in place instead of being re-concatenated every turn. It holds a full
+        # window plus the longest possible reply. On CUDA, new tokens go through
+        # a pinned host buffer so the host-to-device copy can run asynchronously.
+        if chat_history is not None:
+            history_buffer, history_length, past_key_values, staging_buffer = chat_history
+        else:
+            history_buffer = torch.full(
+                (1, HISTORY_WINDOW + MAX_RESPONSE_TOKENS), tokenizer.pad_token_id, dtype=torch.long, device=model.device
+            )
+            history_length, past_key_values = 0, None
+            staging_buffer = None
+            if model.device.type == "cuda":
+                staging_buffer = torch.empty((1, HISTORY_WINDOW), dtype=torch.long, pin_memory=True)
+        
+        # Keep the per-turn cost bounded: once the conversation outgrows the
+        # window, cut it back to half the window at a turn boundary. GPT-2's
+        # learned absolute positions are baked into the cached keys/values, so
+        # the cache can't be trimmed; drop it and prefill the shorter history.
+        # The kept history moves into a fresh buffer: the committed session state
+        # still points at the old one and must stay intact if this turn is abandoned.
+        if history_length + new_length > HISTORY_WINDOW:
+            keep_tokens = max(HISTORY_WINDOW // 2 - new_length, 0)
+            start = turn_boundary_start(history_buffer[:, :history_length], keep_tokens, tokenizer.eos_token_id)
+            new_buffer = torch.full_like(history_buffer, tokenizer.pad_token_id)
+            new_buffer[:, :history_length - start] = history_buffer[:, start:history_length]
+            history_buffer, history_length = new_buffer, history_length - start
+            past_key_values = None
+        
+        # Append the new user input tokens and reuse the cached keys/values
+        # so only the new tokens are prefilled
+        if staging_buffer is not None:
+            staging_buffer[:, :new_length] = new_user_input_ids
+            history_buffer[:, history_length:history_length + new_length].copy_(
+                staging_buffer[:, :new_length], non_blocking=True
             )
+        else:
+            history_buffer[:, history_length:history_length + new_length] = new_user_input_ids
+        history_length += new_length
+        bot_input_ids = history_buffer[:, :history_length]
+        
+        # Hand the request to the shared generation worker and stream the tokens back.
+        # The worker gets its own Cache object, so the one in session state is only
+        # replaced once this turn completes.
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        future = Future()
+        get_generation_queue(tokenizer, model, draft_model).put(
+            (bot_input_ids, copy_cache(past_key_values), max_new_tokens, streamer, future, cancelled)
+        )
+        
+        response = ""
+        for new_text in streamer:
+            response += new_text
+            if placeholder is not None:
+                placeholder.markdown(response)
+        generated_ids, past_key_values = future.result()
         
-        # Decode the response
-        response = tokenizer.decode(chat_history_ids[:, bot_input_ids.shape[-1]:][0], skip_special_tokens=True)
+        # Write the generated tokens back into the history buffer
+        history_buffer[:, history_length:history_length + generated_ids.shape[-1]] = generated_ids
+        history_length += generated_ids.shape[-1]
         
-        return response, chat_history_ids
+        return response, (history_buffer, history_length, past_key_values, staging_buffer)
     except Exception as e:
         return f"Sorry, I encountered an error: {str(e)}", None
+    finally:
+        cancelled.set()
 
+@st.cache_data
 def get_sample_conversations():
     """Get sample conversation starters"""
     return {
@@ -82,7 +534,15 @@ def get_sample_conversations():
         "Problem Solving": "I'm facing a difficult decision at work. Can you help me think through it?"
     }
 
-def main():
+@st.cache_resource
+def encoded_starters(_tokenizer):
+    """Get the conversation starters encoded once with the chat tokenizer"""
+    return {
+        topic: encode_user_input(_tokenizer, starter)
+        for topic, starter in get_sample_conversations().items()
+    }
+
+def main(tokenizer, model, draft_model=None):
     # Initialize session state
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
@@ -96,12 +556,12 @@ def main():
         st.header("⚙️ Chat Settings")
         
         # Model settings
-        max_length = st.slider(
+        max_new_tokens = st.slider(
             "Max Response Length", 
-            min_value=100, 
-            max_value=2000, 
-            value=1000, 
-            help="Maximum length of the generated response"
+            min_value=50, 
+            max_value=MAX_RESPONSE_TOKENS, 
+            value=200, 
+            help="Maximum number of tokens in the generated response"
         )
         
         # Conversation management
@@ -115,14 +575,28 @@ def main():
             st.rerun()
         
         # Display conversation stats
-        st.metric("Messages Exchanged", len(st.session_state.chat_history))
+        stats_placeholder = st.empty()
+        stats_placeholder.metric("Messages Exchanged", len(st.session_state.chat_history))
+        
+        # Describe the model that is actually loaded
+        if MODEL_NAME == DRAFT_MODEL_NAME:
+            model_note = """We run the *small* DialoGPT variant: replies are a little
+        less rich than the medium model, but it loads faster, uses
+        about a third of the memory and answers much quicker on CPU."""
+        elif draft_model is not None:
+            model_note = f"""We run **{MODEL_NAME}**, with DialoGPT-small drafting
+        tokens for faster (speculative) decoding."""
+        else:
+            model_note = f"We run **{MODEL_NAME}**."
         
         st.markdown("---")
-        st.markdown("""
+        st.markdown(f"""
         ### About
         This chatbot uses Microsoft's DialoGPT model to 
         generate human-like responses in conversation.
         
+        {model_note}
+        
         **Features:**
         - 🎨 Natural conversation flow
         - 🧠 Context-aware responses  
@@ -130,6 +604,9 @@ def main():
         - ⚡ Fast response generation
         """)
     
+    # Chat input, pinned to the bottom of the page
+    user_input = st.chat_input("Your message:")
+    
     # Main chat interface
     col1, col2 = st.columns([2, 1])
     
@@ -140,32 +617,13 @@ def main():
         chat_container = st.container()
         
         with chat_container:
+            welcome_placeholder = st.empty()
             if st.session_state.chat_history:
-                for i, (role, message) in enumerate(st.session_state.chat_history):
-                    if role == "user":
-                        st.markdown(f"👤 **You:** {message}")
-                    else:
-                        st.markdown(f"🤖 **AI:** {message}")
-                    
-                    if i < len(st.session_state.chat_history) - 1:
-                        st.markdown("---")
+                for role, message in st.session_state.chat_history:
+                    with st.chat_message(role):
+                        st.markdown(message)
             else:
-                st.info("👋 Welcome! Start a conversation by typing a message below.")
-        
-        # Chat input
-        user_input = st.text_input(
-            "Your message:", 
-            placeholder="Type your message here...",
-            key="user_input"
-        )
-        
-        col_send, col_clear = st.columns([1, 1])
-        with col_send:
-            send_button = st.button("💬 Send Message", type="primary", use_container_width=True)
-        with col_clear:
-            if st.button("🗑️ Clear Input", use_container_width=True):
-                st.session_state.user_input = ""
-                st.rerun()
+                welcome_placeholder.info("👋 Welcome! Start a conversation by typing a message below.")
     
     with col2:
         st.subheader("💡 Quick Starters")
@@ -174,40 +632,47 @@ def main():
         
         st.markdown("**Try these conversation starters:**")
         
+        selected_starter = None
         for topic, starter in sample_conversations.items():
             if st.button(f"{topic}", key=f"starter_{topic}", use_container_width=True):
-                st.session_state.selected_starter = starter
-                st.rerun()
+                selected_starter = topic
         
         # Handle selected starter
-        if hasattr(st.session_state, 'selected_starter'):
-            user_input = st.session_state.selected_starter
-            delattr(st.session_state, 'selected_starter')
+        if selected_starter:
+            user_input = sample_conversations[selected_starter]
     
     # Process user input
-    if (send_button or hasattr(st.session_state, 'selected_starter')) and user_input:
-        with st.spinner("🤖 AI is thinking..."):
-            # Load model
-            tokenizer, model = load_chatbot()
+    if user_input:
+        if tokenizer and model:
+            # Add user message to chat history
+            st.session_state.chat_history.append(("user", user_input))
             
-            if tokenizer and model:
-                # Add user message to chat history
-                st.session_state.chat_history.append(("user", user_input))
-                
-                # Generate AI response
-                ai_response, new_chat_history = generate_response(
-                    tokenizer, model, st.session_state.model_chat_history, user_input, max_length
-                )
-                
-                # Update chat history
-                st.session_state.chat_history.append(("ai", ai_response))
-                st.session_state.model_chat_history = new_chat_history
-                st.session_state.conversation_count += 1
-                
-                # Clear input and refresh
-                st.rerun()
-            else:
-                st.error("Failed to load the chatbot model. Please refresh the page and try again.")
+            # Render only the new messages; earlier ones are already on the page
+            with chat_container:
+                welcome_placeholder.empty()
+                with st.chat_message("user"):
+                    st.markdown(user_input)
+                with st.chat_message("ai"):
+                    response_placeholder = st.empty()
+                    
+                    # Starters are pre-encoded, so skip tokenization for them
+                    starter_ids = encoded_starters(tokenizer)[selected_starter] if selected_starter else None
+                    
+                    # Generate AI response, streaming tokens into the placeholder
+                    with st.spinner("🤖 AI is thinking..."):
+                        ai_response, new_chat_history = generate_response(
+                            tokenizer, model, st.session_state.model_chat_history, user_input, max_new_tokens,
+                            placeholder=response_placeholder, input_ids=starter_ids, draft_model=draft_model
+                        )
+                    response_placeholder.markdown(ai_response)
+            
+            # Update chat history
+            st.session_state.chat_history.append(("ai", ai_response))
+            st.session_state.model_chat_history = new_chat_history
+            st.session_state.conversation_count += 1
+            stats_placeholder.metric("Messages Exchanged", len(st.session_state.chat_history))
+        else:
+            st.error("Failed to load the chatbot model. Please refresh the page and try again.")
     
     # Footer
     st.markdown("---")
@@ -219,4 +684,9 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
+    # Load the model before rendering so the first message doesn't pay the cold start.
+    # st.cache_resource keeps it resident across reruns, since Streamlit re-executes
+    # this script (and resets its globals) on every interaction.
+    configure_torch()
+    tokenizer, model, draft_model = load_chatbot()
+    main(tokenizer, model, draft_model)